@@ -0,0 +1,260 @@
+import os
+import io
+import sys
+import json
+import time
+import math
+import random
+import hashlib
+import argparse
+import tempfile
+import threading
+import contextlib
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from parser import Parser, ResultWriter
+
+# Страница-заменитель выдачи поиска: та же структура DOM, на которую опирается парсер
+SEARCH_PAGE_TEMPLATE = '''<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8"><title>Search</title></head>
+<body>
+<div id="react-root"></div>
+<script>
+const config = %(config)s;
+setTimeout(() => {
+    const root = document.getElementById('react-root');
+    if (config.state === 'error') {
+        root.innerHTML = '<main><div><button><div><span><span>Retry</span></span></div></button></div></main>';
+        return;
+    }
+    if (config.state === 'empty') {
+        root.innerHTML = '<main><div data-testid="emptyState">No results for "' + config.query + '"</div></main>';
+        return;
+    }
+    let html = '<main><div aria-label="Timeline: Search timeline"><div>';
+    for (let i = 0; i < config.count; i++) {
+        const id = config.first_id + i;
+        html += '<div><article><a href="/user' + i + '/status/' + id + '">'
+            + '<time datetime="' + new Date(Date.now() - i * 60000).toISOString() + '"></time></a>'
+            + '<div>' + config.query + '</div></article></div>';
+    }
+    root.innerHTML = html + '</div></div></main>';
+}, config.delay);
+</script>
+</body>
+</html>
+'''
+
+HOME_PAGE = '<!DOCTYPE html><html><head><meta charset="utf-8"><title>Home</title></head><body><div id="react-root"></div></body></html>'
+
+
+def query_outcome(query, max_results, empty_ratio, error_rate, retry=False):
+    """
+    Детерминированный результат поиска по запросу: (состояние, количество, первый ID).
+    Баннер Retry показывается только на первую попытку - повтор после сброса сессии проходит.
+    """
+    digest = int(hashlib.md5(query.encode('utf-8')).hexdigest(), 16)
+    if not retry and (digest % 10000) / 10000 < error_rate:
+        return 'error', 0, 0
+    if ((digest >> 16) % 10000) / 10000 < empty_ratio:
+        return 'empty', 0, 0
+    return 'results', 1 + (digest >> 32) % max_results, 10 ** 18 + (digest >> 48) % 10 ** 12
+
+
+def make_handler(options):
+    """Обработчик HTTP-запросов локального сервера с настройками выдачи"""
+    # Запросы, на которые уже показан баннер Retry
+    errored_queries = set()
+    lock = threading.Lock()
+
+    class SearchPageHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == '/search':
+                query = parse_qs(url.query).get('q', [''])[0]
+                with lock:
+                    retry = query in errored_queries
+                    state, count, first_id = query_outcome(query, options.results, options.empty_ratio,
+                                                           options.error_rate, retry)
+                    if state == 'error':
+                        errored_queries.add(query)
+                config = {'query': query, 'state': state, 'count': count, 'first_id': first_id, 'delay': options.delay_ms}
+                self._send(SEARCH_PAGE_TEMPLATE % {'config': json.dumps(config)})
+            elif url.path == '/home':
+                self._send(HOME_PAGE)
+            else:
+                self.send_error(404)
+
+        def _send(self, body):
+            data = body.encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return SearchPageHandler
+
+
+def start_server(options):
+    """Запуск локального сервера на свободном порту в отдельном потоке"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(options))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def write_input_csv(csv_file, wallets, seed):
+    """Синтетический input.csv со случайными EVM-адресами"""
+    rng = random.Random(seed)
+    with open(csv_file, 'w', encoding='utf-8') as f:
+        f.write('address,amount\n')
+        for _ in range(wallets):
+            address = '0x' + ''.join(rng.choice('0123456789abcdef') for _ in range(40))
+            f.write(f'{address},"{rng.randint(1, 400000):,}.{rng.randint(0, 99):02d}"\n')
+
+
+def percentile(values, p):
+    """Перцентиль по ближайшему рангу"""
+    if not values:
+        return None
+    values = sorted(values)
+    rank = max(0, min(len(values) - 1, math.ceil(p / 100 * len(values)) - 1))
+    return values[rank]
+
+
+def instrument(parser, stats):
+    """Замеры этапов без изменения логики парсера (команды WebDriver считает сам парсер)"""
+    def timed(name, method):
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                stats['stages'][name].append(time.perf_counter() - started)
+        return wrapper
+
+    parser.search = timed('search', parser.search)
+    parser.wait_for_search_state = timed('wait', parser.wait_for_search_state)
+    parser.measure_transfer = timed('measure', parser.measure_transfer)
+
+    write_result = parser.write_result
+    last_written = [time.perf_counter()]
+
+    def write_result_timed(*args, **kwargs):
+        result = write_result(*args, **kwargs)
+        now = time.perf_counter()
+        stats['stages']['wallet'].append(now - last_written[0])
+        last_written[0] = now
+        stats['wallets'] += 1
+        return result
+
+    parser.write_result = write_result_timed
+
+
+def run_benchmark(options):
+    """Прогон парсера против локальной страницы поиска"""
+    server = start_server(options)
+    base_url = f'http://127.0.0.1:{server.server_address[1]}'
+    workdir = tempfile.mkdtemp(prefix='parser-bench-')
+    cwd = os.getcwd()
+    stats = {'wallets': 0, 'stages': {'search': [], 'wait': [], 'measure': [], 'wallet': []}}
+
+    try:
+        # Файлы парсера (chrome-data, output.csv) создаются во временной директории
+        os.chdir(workdir)
+        write_input_csv('input.csv', options.wallets, options.seed)
+
+        parser = Parser(
+            search_timeout=options.search_timeout,
+            result_writer=ResultWriter('output.csv'),
+            search_mode='url',
+            # Стенд не отдает ответ API SearchTimeline (Chrome ходит на localhost в обход
+            # прокси selenium-wire), поэтому измеряется разбор выдачи со страницы
+            extract_mode='dom',
+            block_profile=options.block,
+            fast_start=not options.headed,
+            base_url=base_url
+        )
+        # Авторизация не нужна: сразу браузер и поиск (в том числе после сброса сессии)
+        def login(url, username=None, password=None):
+            if not parser.driver:
+                parser.setup_driver()
+            parser.driver.get(url)
+
+        parser.login = login
+        parser.ensure_search_ready()
+        commands_before = parser.metrics.counters['webdriver_commands']
+        instrument(parser, stats)
+
+        log = io.StringIO()
+        started = time.perf_counter()
+        try:
+            with contextlib.redirect_stdout(log if options.quiet else sys.stdout):
+                parser.parse_data(parser.read_wallet_addresses('input.csv'))
+        finally:
+            elapsed = time.perf_counter() - started
+            commands = parser.metrics.counters['webdriver_commands'] - commands_before
+            parser.close()
+    finally:
+        os.chdir(cwd)
+        server.shutdown()
+
+    wallets = stats['wallets']
+    report = {
+        'wallets': wallets,
+        'elapsed': round(elapsed, 3),
+        'wallets_per_sec': round(wallets / elapsed, 3) if elapsed else None,
+        'commands_per_wallet': round(commands / wallets, 2) if wallets else None,
+        'latency': {
+            name: {f'p{p}': round(percentile(values, p), 4) for p in (50, 90, 99)}
+            for name, values in stats['stages'].items() if values
+        },
+        'workdir': workdir,
+    }
+    return report
+
+
+def print_report(report):
+    """Вывод результатов прогона"""
+    print(f"Кошельков: {report['wallets']} за {report['elapsed']:.2f} c "
+          f"({report['wallets_per_sec']} кошельков/с)")
+    print(f"Команд WebDriver на кошелек: {report['commands_per_wallet']}")
+    for name, values in report['latency'].items():
+        print(f"  {name:<8} " + '  '.join(f"{key}={value * 1000:.0f} мс" for key, value in values.items()))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Офлайн-бенчмарк парсера на локальной странице поиска')
+    arg_parser.add_argument('--wallets', type=int, default=50, help='Количество кошельков в синтетическом input.csv')
+    arg_parser.add_argument('--delay-ms', type=int, default=300, help='Задержка отрисовки выдачи на странице (мс)')
+    arg_parser.add_argument('--results', type=int, default=20, help='Максимум твитов в выдаче')
+    arg_parser.add_argument('--empty-ratio', type=float, default=0.7, help='Доля запросов с пустой выдачей')
+    arg_parser.add_argument('--error-rate', type=float, default=0.0, help='Доля запросов с баннером Retry (вызывает сброс сессии)')
+    arg_parser.add_argument('--search-timeout', type=float, default=10, help='Максимальное ожидание результата поиска (секунды)')
+    arg_parser.add_argument('--block', choices=['none', 'media', 'full'], default='full', help='Профиль блокировки ресурсов')
+    arg_parser.add_argument('--headed', action='store_true', help='Запускать браузер с окном')
+    arg_parser.add_argument('--seed', type=int, default=1, help='Seed генерации адресов')
+    arg_parser.add_argument('--verbose', dest='quiet', action='store_false', help='Показывать вывод парсера')
+    arg_parser.add_argument('--json', default=None, help='Сохранить результаты в JSON-файл')
+    arg_parser.add_argument('--min-wallets-per-sec', type=float, default=None, help='Завершиться с ошибкой, если скорость ниже')
+    args = arg_parser.parse_args()
+
+    report = run_benchmark(args)
+    print_report(report)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=4)
+
+    if args.min_wallets_per_sec is not None and (report['wallets_per_sec'] or 0) < args.min_wallets_per_sec:
+        print(f"Скорость ниже порога {args.min_wallets_per_sec} кошельков/с")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
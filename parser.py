@@ -1,56 +1,320 @@
+import time
+_imports_started = time.perf_counter()
 import os
 import pickle
-import time
 import json
 import argparse
+import csv
 import random
-from seleniumwire import webdriver
+import sys
+import sqlite3
+import queue
+import threading
+import cProfile
+from contextlib import contextmanager
+from urllib.parse import urlencode
+from collections import deque
+from datetime import datetime, timezone
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.keys import Keys
-from selenium.common.exceptions import NoSuchElementException
+from selenium.common.exceptions import (NoSuchElementException, TimeoutException, WebDriverException,
+                                        InvalidSessionIdException, NoSuchWindowException)
+from selenium.webdriver.remote.remote_connection import RemoteConnection
+from urllib3.exceptions import HTTPError as TransportError
 from selenium.webdriver.common.action_chains import ActionChains
-import pandas as pd
+# pandas и seleniumwire импортируются при первом использовании
+IMPORTS_TIME = time.perf_counter() - _imports_started
+
+BASE_URL = 'https://x.com'
+
+# Локаторы элементов страницы поиска
+FIRST_SEARCH_INPUT_XPATH = '''//*[@id="react-root"]/div/div/div[2]/main/div/div/div/div[2]/div/div[2]/div/div/div/div/div[1]/div/div/div/form/div[1]/div/div/div/div/div[2]/div/input'''
+SEARCH_INPUT_XPATH = '''//*[@id="react-root"]/div/div/div[2]/main/div/div/div/div[1]/div/div[1]/div[1]/div[1]/div/div/div/div/div[2]/div[2]/div/div/div/form/div[1]/div/div/div/div/div[2]/div/input'''
+SEARCH_TIMELINE_XPATH = '//*[@aria-label="Timeline: Search timeline"]'
+RETRY_BUTTON_XPATH = '/html/body/div[1]/div/div/div[2]/main/div/div/div/div/div/div[3]/div/button/div/span/span'
+
+# Снимок страницы поиска за один вызов execute_script.
+# arguments[0] - запрос; пока адрес страницы не соответствует запросу, выдача считается старой.
+# Состояния: results, empty, error (баннер Retry), loading.
+SEARCH_EXTRACTOR_JS = '''
+const query = arguments[0];
+const params = new URLSearchParams(window.location.search);
+const result = {state: 'loading', count: 0, tweets: []};
+if (window.location.pathname !== '/search' || params.get('q') !== query) {
+    return result;
+}
+const timeline = document.querySelector('[aria-label="Timeline: Search timeline"]');
+if (timeline) {
+    const seen = new Set();
+    for (const article of timeline.querySelectorAll('article')) {
+        const link = article.querySelector('a[href*="/status/"]');
+        const match = link && link.getAttribute('href').match(/\\/status\\/(\\d+)/);
+        if (!match || seen.has(match[1])) {
+            continue;
+        }
+        seen.add(match[1]);
+        const time = article.querySelector('time');
+        result.tweets.push({id: match[1], time: time ? time.getAttribute('datetime') : null, text: article.innerText});
+    }
+}
+result.count = result.tweets.length;
+if (result.count) {
+    result.state = 'results';
+} else if (document.querySelector('[data-testid="emptyState"]')) {
+    result.state = 'empty';
+} else if (Array.from(document.querySelectorAll('button')).some(b => b.innerText.trim() === 'Retry')) {
+    result.state = 'error';
+}
+return result;
+'''
+
+# Прокрутка выдачи на два экрана вниз
+SCROLL_JS = 'window.scrollBy(0, window.innerHeight * 2);'
+
+# Код ошибки API "Rate limit exceeded" в теле ответа
+RATE_LIMIT_ERROR_CODE = 88
+
+# Запрос API, которым страница поиска загружает выдачу
+SEARCH_TIMELINE_ENDPOINT = '/SearchTimeline'
+
+# Запросы, которые перехватывает selenium-wire (остальные проходят без сохранения)
+CAPTURE_SCOPES = ['.*' + SEARCH_TIMELINE_ENDPOINT + '.*']
+
+# Профили блокировки ресурсов (шаблоны Network.setBlockedURLs)
+BLOCK_MEDIA_PATTERNS = [
+    '*.jpg*', '*.jpeg*', '*.png*', '*.gif*', '*.webp*', '*.ico*',
+    '*.mp4*', '*.m3u8*', '*.m4s*', '*.webm*',
+    '*.woff*', '*.ttf*', '*.otf*',
+    '*pbs.twimg.com/media/*', '*pbs.twimg.com/profile_images/*', '*pbs.twimg.com/profile_banners/*',
+    '*pbs.twimg.com/card_img/*', '*pbs.twimg.com/ext_tw_video_thumb/*', '*pbs.twimg.com/amplify_video_thumb/*',
+    '*video.twimg.com/*',
+]
+BLOCK_TRACKER_PATTERNS = [
+    '*google-analytics.com/*', '*googletagmanager.com/*', '*doubleclick.net/*',
+    '*ads-twitter.com/*', '*ads-api.x.com/*', '*analytics.twitter.com/*',
+    '*/i/api/1.1/jot/*', '*/i/api/1.1/keyregistry/*',
+]
+BLOCK_PROFILES = {
+    'none': [],
+    'media': BLOCK_MEDIA_PATTERNS,
+    'full': BLOCK_MEDIA_PATTERNS + BLOCK_TRACKER_PATTERNS,
+}
+
+# Объем загруженного документом (байты, по Resource Timing) и время его создания:
+# при смене timeOrigin (новый документ или вкладка) счет начинается заново.
+# Для сторонних доменов без Timing-Allow-Origin браузер отдает 0.
+TRANSFER_SIZE_JS = '''
+return {
+    origin: performance.timeOrigin,
+    total: performance.getEntriesByType('navigation')
+        .concat(performance.getEntriesByType('resource'))
+        .reduce((total, entry) => total + (entry.transferSize || 0), 0)
+};
+'''
+
+# Маркер конца данных в очередях конвейера
+PIPELINE_END = object()
+
+# Статусы, после которых адрес считается обработанным
+COMPLETED_STATUSES = ('results', 'empty', 'cached')
+
+# EVM-адрес (0x + 40 hex) или адрес из букв и цифр для остальных сетей
+WALLET_ADDRESS_PATTERN = r'0x[0-9a-fA-F]{40}|(?!0x)[A-Za-z0-9]{25,100}'
+
+# Сообщения chromedriver об упавшем или отключенном браузере
+BROWSER_CRASH_MESSAGES = ('chrome not reachable', 'disconnected', 'session deleted', 'tab crashed', 'target window already closed')
+
+
+class BrowserFailure(Exception):
+    """Браузер завис (команда WebDriver не уложилась в срок) или упал"""
+
+
+def is_browser_failure(error):
+    """Ошибка команды WebDriver означает зависание или падение браузера"""
+    # Таймаут, пришедший из самой команды, - это таймаут загрузки страницы или скрипта
+    if isinstance(error, (TimeoutException, InvalidSessionIdException, NoSuchWindowException)):
+        return True
+    if isinstance(error, WebDriverException):
+        return any(message in (error.msg or '').lower() for message in BROWSER_CRASH_MESSAGES)
+    # Истек срок HTTP-запроса к chromedriver или процесс драйвера недоступен
+    return isinstance(error, (TransportError, OSError))
+
 
 class Parser:
-    def __init__(self, proxy=None, proxy_username=None, proxy_password=None):
+    def __init__(self, proxy=None, proxy_username=None, proxy_password=None,
+                 page_timeout=15, search_timeout=10, poll_frequency=0.2, result_cache=None,
+                 result_writer=None, progress_journal=None, search_mode='url', search_tab='top',
+                 search_since=None, search_until=None, extract_mode='network',
+                 capture_max_requests=100, capture_max_bytes=20 * 1024 * 1024, block_profile='full',
+                 fast_start=False, base_url=BASE_URL, queue_size=100, rate_limiter=None,
+                 metrics=None, batch_size=1, max_query_length=500, incremental=False,
+                 count_mode='first-page', count_threshold=None, max_scroll_pages=10, scroll_timeout=3,
+                 max_tweets=1000, page_load_timeout=30, script_timeout=10, command_timeout=60,
+                 max_restarts=3, max_rate_limit_retries=5, max_block_resets=3, memory_check_every=50, max_heap_mb=None, max_dom_nodes=None,
+                 recycle_mode='tab', memory_log=None):
         self.cookies_file = 'cookies.pkl'
         self.driver = None
         self.proxy = proxy
         self.proxy_username = proxy_username
         self.proxy_password = proxy_password
         self.chrome_data_dir = 'chrome-data'
+        self.base_url = base_url
+        # Предельные времена ожидания (секунды)
+        self.page_timeout = page_timeout
+        self.search_timeout = search_timeout
+        self.poll_frequency = poll_frequency
+        # Фактическая длительность каждого ожидания результата поиска
+        self.wait_timings = []
+        # Хранилище уже найденных результатов (None - без кэша)
+        self.result_cache = result_cache
+        # Запись результатов в выходной файл
+        self.result_writer = result_writer or ResultWriter()
+        # Журнал обработанных адресов для продолжения после остановки (None - без журнала)
+        self.progress_journal = progress_journal
+        self.search_ready = False
+        # Поиск переходом по URL (url) или вводом в строку поиска (input)
+        self.search_mode = search_mode
+        # Фильтры поиска: вкладка (top/latest) и диапазон дат (YYYY-MM-DD)
+        self.search_tab = search_tab
+        self.search_since = search_since
+        self.search_until = search_until
+        # Разбор выдачи из перехваченного ответа API (network) или из DOM (dom)
+        self.extract_mode = extract_mode
+        # Ограничения хранилища перехваченных запросов
+        self.capture_max_requests = capture_max_requests
+        self.capture_max_bytes = capture_max_bytes
+        self.capture_stats = {'purges': 0, 'requests': 0, 'peak_requests': 0, 'peak_bytes': 0}
+        # Последний нераспознанный ответ поиска (сообщение выводится один раз)
+        self.unparsed_request = None
+        # Блокировка картинок, видео, шрифтов и трекеров (none/media/full)
+        self.block_profile = block_profile
+        self.transfer_total = 0
+        self.transfer_origin = None
+        self.transfer_bytes = []
+        # Быстрый старт: headless Chrome без разворачивания окна
+        self.fast_start = fast_start
+        # Время этапов запуска (секунды)
+        self.startup_timings = {'imports': IMPORTS_TIME}
+        # Размер очередей между этапами конвейера
+        self.queue_size = queue_size
+        # Темп поиска по сигналам лимитов сервера
+        self.rate_limiter = rate_limiter or RateLimiter()
+        # Метрики этапов, счетчики и память
+        self.metrics = metrics or Metrics()
+        # Пакетный поиск: до batch_size адресов в одном запросе через OR
+        self.batch_size = batch_size
+        self.max_query_length = max_query_length
+        # Повторная проверка только твитов новее сохраненных в кэше
+        self.incremental = incremental
+        # Подсчет по первой странице (first-page) или с прокруткой (scroll)
+        self.count_mode = count_mode
+        # Остановка прокрутки: достаточно знать, что твитов не меньше count_threshold
+        self.count_threshold = count_threshold
+        self.max_scroll_pages = max_scroll_pages
+        self.scroll_timeout = scroll_timeout
+        # Предел множества ID при прокрутке без порога
+        self.max_tweets = max_tweets
+        # Сроки команд WebDriver (секунды): загрузка страницы, скрипт, любой HTTP-запрос к chromedriver
+        self.page_load_timeout = page_load_timeout
+        self.script_timeout = script_timeout
+        self.command_timeout = command_timeout
+        # Сколько раз подряд перезапускать браузер на одном запросе
+        self.max_restarts = max_restarts
+        # Сколько раз подряд ждать сброса лимита на одном запросе
+        self.max_rate_limit_retries = max_rate_limit_retries
+        # Сколько раз подряд сбрасывать сессию из-за спам-блокировки на одном запросе
+        self.max_block_resets = max_block_resets
+        # Начало команды, на которой браузер завис или упал
+        self.failure_started = None
+        # Замер памяти вкладки каждые memory_check_every поисков (0 - без замеров)
+        self.memory_check_every = memory_check_every
+        # Пороги, после которых вкладка (tab) или браузер (driver) пересоздаются
+        self.max_heap_mb = max_heap_mb
+        self.max_dom_nodes = max_dom_nodes
+        self.recycle_mode = recycle_mode
+        # CSV с замерами памяти и задержкой поиска
+        self.memory_log = memory_log
+        self.memory_latencies = []
+        self.recycles = 0
         
     def setup_driver(self):
         """Настройка и инициализация драйвера"""
+        started = time.perf_counter()
+        from seleniumwire import webdriver
+        if 'driver_launch' not in self.startup_timings:
+            self.startup_timings['imports'] += time.perf_counter() - started
+        
+        started = time.perf_counter()
         chrome_options = Options()
 
         chrome_options.add_argument("--disable-blink-features")
-        chrome_options.add_argument("--start-maximized")
+        if self.fast_start:
+            chrome_options.add_argument("--headless=new")
+            chrome_options.add_argument("--window-size=1920,1080")
+        else:
+            chrome_options.add_argument("--start-maximized")
         chrome_options.add_argument('--disable-blink-features=AutomationControlled')
         chrome_options.add_argument("--user-data-dir=chrome-data")
         
+        # Перехват запросов selenium-wire: только в памяти и с ограничением количества,
+        # без перехвата вовсе, если выдача разбирается со страницы
+        seleniumwire_options = {
+            'request_storage': 'memory',
+            'request_storage_max_size': self.capture_max_requests,
+            'disable_capture': self.extract_mode != 'network',
+        }
+        
         # Настройка прокси через selenium-wire
-        seleniumwire_options = None
         if self.proxy:
             proxy_url = f"socks5://{self.proxy_username}:{self.proxy_password}@{self.proxy}"
-            seleniumwire_options = {
-                'proxy': {
-                    'http': proxy_url,
-                    'https': proxy_url,
-                    'no_proxy': 'localhost,127.0.0.1'
-                }
+            seleniumwire_options['proxy'] = {
+                'http': proxy_url,
+                'https': proxy_url,
+                'no_proxy': 'localhost,127.0.0.1'
             }
 
+        # Срок любой команды: зависший chromedriver не блокирует вызов бесконечно
+        RemoteConnection.set_timeout(self.command_timeout)
         self.driver = webdriver.Chrome(
             options=chrome_options,
             seleniumwire_options=seleniumwire_options
         )
-        self.driver.maximize_window()
+        # Ожидания в парсере явные, неявное ожидание отключено
+        self.driver.set_page_load_timeout(self.page_load_timeout)
+        self.driver.set_script_timeout(self.script_timeout)
+        self.driver.implicitly_wait(0)
+        if not self.fast_start:
+            self.driver.maximize_window()
+        # Перехватываем только запросы выдачи поиска
+        self.driver.scopes = CAPTURE_SCOPES
+        self.setup_page()
+        self.transfer_total = 0
+        self.transfer_origin = None
+        self.startup_timings.setdefault('driver_launch', time.perf_counter() - started)
+        self.metrics.observe('driver_setup', time.perf_counter() - started)
+        
+        # Подсчет команд WebDriver и распознавание зависшего или упавшего браузера
+        driver_execute = self.driver.execute
         
+        def execute(driver_command, params=None):
+            self.metrics.inc('webdriver_commands')
+            started = time.perf_counter()
+            try:
+                return driver_execute(driver_command, params)
+            except Exception as e:
+                if not is_browser_failure(e):
+                    raise
+                self.failure_started = started
+                raise BrowserFailure(f'{driver_command}: {type(e).__name__} {e}') from e
+        
+        self.driver.execute = execute
+        
+    def setup_page(self):
+        """Настройка текущей вкладки через CDP: антидетект, блокировка ресурсов, метрики памяти"""
         # Выполняем антидетект скрипт
         self.driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {
         'source': '''
@@ -60,6 +324,15 @@ class Parser:
         '''
         })
         
+        # Блокируем лишние ресурсы страницы
+        blocked_urls = BLOCK_PROFILES[self.block_profile]
+        if blocked_urls:
+            self.driver.execute_cdp_cmd("Network.enable", {})
+            self.driver.execute_cdp_cmd("Network.setBlockedURLs", {'urls': blocked_urls})
+        
+        if self.memory_check_every:
+            self.driver.execute_cdp_cmd("Performance.enable", {})
+
     def save_cookies(self):
         """Сохранение куки в файл"""
         if self.driver:
@@ -119,8 +392,10 @@ class Parser:
         """Авторизация на сайте"""
         if not self.driver:
             self.setup_driver()
-            
+        
+        started = time.perf_counter()
         self.driver.get(url)
+        self.startup_timings.setdefault('first_page_load', time.perf_counter() - started)
         
         # Если есть сохраненные куки, пробуем их использовать
         if self.load_cookies():
@@ -210,6 +485,103 @@ class Parser:
             print("Ожидание ручной авторизации...")
             time.sleep(30)  # Увеличиваем время ожидания для ручной авторизации
             
+    def sample_browser_memory(self):
+        """Память вкладки через CDP Performance.getMetrics: JS heap (байты) и число узлов DOM"""
+        values = {item['name']: item['value'] for item in self.driver.execute_cdp_cmd("Performance.getMetrics", {})['metrics']}
+        return {
+            'js_heap_used_bytes': int(values.get('JSHeapUsedSize', 0)),
+            'js_heap_total_bytes': int(values.get('JSHeapTotalSize', 0)),
+            'dom_nodes': int(values.get('Nodes', 0)),
+            'js_event_listeners': int(values.get('JSEventListeners', 0)),
+        }
+
+    def check_browser_memory(self):
+        """
+        Периодический замер памяти вкладки между поисками.
+        При превышении порогов вкладка или браузер пересоздаются.
+        Ошибки замера не влияют на уже полученные результаты поиска.
+        """
+        if not self.memory_check_every or len(self.memory_latencies) < self.memory_check_every:
+            return
+        latency = sum(self.memory_latencies) / len(self.memory_latencies)
+        self.memory_latencies = []
+        
+        try:
+            self._check_browser_memory(latency)
+        except Exception as e:
+            print(f"Ошибка замера памяти или пересоздания вкладки: {e}")
+            # Следующий поиск заново подготовит браузер (или перезапустит его через run_query)
+            self.search_ready = False
+
+    def _check_browser_memory(self, latency):
+        """Замер памяти, запись в лог и пересоздание при превышении порогов"""
+        sample = self.sample_browser_memory()
+        self.metrics.set_browser_memory(sample)
+        self.write_memory_log(sample, latency)
+        
+        heap_mb = sample['js_heap_used_bytes'] / 1024 / 1024
+        print(f"Память вкладки: JS heap {heap_mb:.1f} МБ, узлов DOM {sample['dom_nodes']}, "
+              f"средняя задержка поиска {latency:.2f} c")
+        
+        if (self.max_heap_mb and heap_mb > self.max_heap_mb) or \
+                (self.max_dom_nodes and sample['dom_nodes'] > self.max_dom_nodes):
+            self.recycle_browser()
+
+    def write_memory_log(self, sample, latency):
+        """Дозапись замера памяти и средней задержки поиска в CSV"""
+        if not self.memory_log:
+            return
+        new_file = not os.path.exists(self.memory_log)
+        with open(self.memory_log, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            if new_file:
+                writer.writerow(['timestamp', 'js_heap_used_bytes', 'js_heap_total_bytes', 'dom_nodes',
+                                 'js_event_listeners', 'search_latency', 'recycles'])
+            writer.writerow([datetime.now().isoformat(timespec='seconds'), sample['js_heap_used_bytes'],
+                             sample['js_heap_total_bytes'], sample['dom_nodes'], sample['js_event_listeners'],
+                             round(latency, 4), self.recycles])
+
+    def recycle_browser(self):
+        """
+        Пересоздание вкладки или браузера для освобождения памяти.
+        Профиль chrome-data и cookies сохраняются, повторная авторизация не нужна.
+        """
+        started = time.perf_counter()
+        self.recycles += 1
+        self.metrics.inc('recycles')
+        if self.recycle_mode == 'driver':
+            self.restart_driver("Превышен порог памяти. Перезапуск браузера...")
+        else:
+            print("Превышен порог памяти. Пересоздание вкладки...")
+            old_handle = self.driver.current_window_handle
+            self.driver.switch_to.new_window('tab')
+            new_handle = self.driver.current_window_handle
+            self.driver.switch_to.window(old_handle)
+            self.driver.close()
+            self.driver.switch_to.window(new_handle)
+            # Настройки CDP действуют только на вкладку, в которой заданы
+            self.setup_page()
+            # Новая вкладка открывается на about:blank - строке поиска нужна страница сайта
+            self.driver.get(self.base_url + "/home")
+            self.search_ready = False
+            self.ensure_search_ready()
+        self.metrics.observe('recycle', time.perf_counter() - started)
+
+    def restart_driver(self, message="Браузер не отвечает. Перезапуск драйвера..."):
+        """
+        Перезапуск браузера без сброса сессии (после зависания или для освобождения памяти):
+        chrome-data и cookies.pkl сохраняются, повторная авторизация не нужна
+        """
+        print(message)
+        if self.driver:
+            try:
+                self.driver.quit()
+            except Exception as e:
+                print(f"Ошибка при закрытии браузера: {e}")
+            self.driver = None
+        self.search_ready = False
+        self.ensure_search_ready()
+
     def reset_session(self):
         """Очистка сессии: удаление cookies.pkl и директории chrome-data"""
         print("Удаление файлов сессии для сброса спам-блока...")
@@ -218,6 +590,7 @@ class Parser:
         if self.driver:
             self.driver.quit()
             self.driver = None
+        self.search_ready = False
             
         # Удаляем файл cookies.pkl
         if os.path.exists(self.cookies_file):
@@ -236,226 +609,1418 @@ class Parser:
             except Exception as e:
                 print(f"Ошибка при удалении директории {self.chrome_data_dir}: {e}")
     
-    def parse_data(self, wallet_data, start_iteration=1):
-        """Метод для парсинга данных"""
-        # Здесь реализуйте вашу логику парсинга
+    def wait_for_element(self, xpath, timeout=None):
+        """Ожидание появления элемента на странице"""
+        return WebDriverWait(self.driver, timeout or self.page_timeout, poll_frequency=self.poll_frequency).until(
+            EC.presence_of_element_located((By.XPATH, xpath))
+        )
+
+    def extract_search_result(self, query):
+        """Снимок страницы поиска одним вызовом: состояние, количество, ID и время твитов"""
+        return self.driver.execute_script(SEARCH_EXTRACTOR_JS, query)
+
+    def capture_size(self, requests):
+        """Объем перехваченных запросов и ответов в байтах"""
+        size = 0
+        for request in requests:
+            size += len(request.body or b'')
+            if request.response is not None:
+                size += len(request.response.body or b'')
+        return size
+
+    def purge_capture(self):
+        """Очистка перехваченных запросов с учетом статистики памяти"""
+        if self.extract_mode != 'network' or not self.driver:
+            return
+        requests = self.driver.requests
+        size = self.capture_size(requests)
+        self.capture_stats['purges'] += 1
+        self.capture_stats['requests'] += len(requests)
+        self.capture_stats['peak_requests'] = max(self.capture_stats['peak_requests'], len(requests))
+        self.capture_stats['peak_bytes'] = max(self.capture_stats['peak_bytes'], size)
+        del self.driver.requests
+
+    def measure_transfer(self):
+        """Байты, загруженные страницей с прошлого замера"""
+        try:
+            transfer = self.driver.execute_script(TRANSFER_SIZE_JS) or {}
+        except BrowserFailure:
+            # Зависание или падение браузера обрабатывает run_query
+            raise
+        except Exception:
+            return None
+        total = transfer.get('total') or 0
+        # Новый документ (поиск по URL) или вкладка - счет начинается заново
+        if transfer.get('origin') != self.transfer_origin:
+            self.transfer_origin = transfer.get('origin')
+            self.transfer_total = 0
+        transferred = max(total - self.transfer_total, 0)
+        self.transfer_total = total
+        self.transfer_bytes.append(transferred)
+        return transferred
+
+    def print_transfer_stats(self):
+        """Вывод статистики загруженных байт на кошелек"""
+        if not self.transfer_bytes:
+            return
+        total = sum(self.transfer_bytes)
+        print(f"Загружено: {total / 1024 / 1024:.1f} МБ, "
+              f"в среднем {total / len(self.transfer_bytes) / 1024:.1f} КБ на кошелек "
+              f"(блокировка: {self.block_profile})")
+
+    def print_startup_stats(self):
+        """Вывод времени этапов запуска"""
+        names = {
+            'imports': 'импорты',
+            'driver_launch': 'запуск браузера',
+            'first_page_load': 'первая страница',
+            'first_search': 'первый поиск',
+        }
+        parts = [f"{title} {self.startup_timings[key]:.2f} c" for key, title in names.items() if key in self.startup_timings]
+        print("Запуск: " + ", ".join(parts))
+
+    def print_capture_stats(self):
+        """Вывод статистики перехваченных запросов"""
+        if not self.capture_stats['purges']:
+            return
+        print(f"Перехвачено запросов: {self.capture_stats['requests']}, "
+              f"максимум за раз: {self.capture_stats['peak_requests']} "
+              f"({self.capture_stats['peak_bytes'] / 1024:.1f} КБ)")
+
+    def extract_network_result(self, query):
+        """Разбор перехваченного ответа SearchTimeline для запроса (None - ответа еще нет)"""
+        requests = self.driver.requests
+        for request in reversed(requests):
+            if SEARCH_TIMELINE_ENDPOINT not in request.path or request.response is None:
+                continue
+            variables = search_request_variables(request)
+            # Первая страница выдачи именно этого запроса
+            if variables.get('rawQuery') != query or variables.get('cursor'):
+                continue
+            response = request.response
+            self.rate_limiter.observe(response.status_code, response.headers)
+            if response.status_code == 429:
+                return {'state': 'error', 'count': 0, 'tweets': [], 'cursor': None}
+            try:
+                from seleniumwire.utils import decode
+                body = decode(response.body, response.headers.get('Content-Encoding', 'identity'))
+                result = parse_search_timeline(json.loads(body))
+                error = 'неизвестный формат ответа'
+            except ValueError as e:
+                result, error = None, e
+            # Нераспознанный ответ - состояние определит разбор страницы
+            if result is None and request.id != self.unparsed_request:
+                self.unparsed_request = request.id
+                print(f"Не удалось разобрать ответ поиска (HTTP {response.status_code}): {error}")
+            return result
+        
+        # Нужного ответа нет, а хранилище переполнено - очищаем его
+        if self.capture_size(requests) > self.capture_max_bytes:
+            self.purge_capture()
+        return None
+
+    def wait_for_search_state(self, query, timeout=None):
+        """
+        Ожидание результата поиска: выдача, пустой результат или баннер ошибки.
+        В режиме network сначала проверяется перехваченный ответ API,
+        иначе страница (один вызов execute_script на проверку).
+        Возвращает кортеж (результат, затраченное время в секундах).
+        """
+        started = time.perf_counter()
+        last_result = {'state': 'loading', 'count': 0, 'tweets': []}
+        
+        def _ready(driver):
+            nonlocal last_result
+            with self.metrics.timer('extraction'):
+                if self.extract_mode == 'network':
+                    network_result = self.extract_network_result(query)
+                    if network_result is not None:
+                        last_result = dict(network_result, source='network')
+                        return True
+                last_result = dict(self.extract_search_result(query), source='dom')
+            return last_result['state'] != 'loading'
         
-        time.sleep(5)
+        try:
+            WebDriverWait(self.driver, timeout or self.search_timeout, poll_frequency=self.poll_frequency).until(_ready)
+        except TimeoutException:
+            last_result['state'] = 'timeout'
+        elapsed = time.perf_counter() - started
+        self.wait_timings.append(elapsed)
+        self.metrics.observe('wait', elapsed)
+        return last_result, elapsed
+
+    def scroll_results(self, query, result):
+        """
+        Подсчет твитов с прокруткой выдачи: ID собираются в ограниченное множество
+        (виртуальный список убирает старые твиты из DOM). Остановка при достижении
+        count_threshold, после max_scroll_pages прокруток или если новые твиты
+        не появились за scroll_timeout (конец выдачи).
+        """
+        limit = self.count_threshold or self.max_tweets
+        tweets = {}
+        for tweet in result['tweets']:
+            if len(tweets) < limit:
+                tweets.setdefault(tweet['id'], tweet)
         
-        # делаем первый поиск
-        search_field = self.driver.find_element(By.XPATH, '''//*[@id="react-root"]/div/div/div[2]/main/div/div/div/div[2]/div/div[2]/div/div/div/div/div[1]/div/div/div/form/div[1]/div/div/div/div/div[2]/div/input''')
+        complete = False
+        pages = 0
+        while len(tweets) < limit and pages < self.max_scroll_pages:
+            self.driver.execute_script(SCROLL_JS)
+            pages += 1
+            
+            new_tweets = []
+            
+            def _new_content(driver):
+                snapshot = self.extract_search_result(query)
+                new_tweets[:] = [tweet for tweet in snapshot['tweets'] if tweet['id'] not in tweets]
+                return bool(new_tweets)
+            
+            try:
+                WebDriverWait(self.driver, self.scroll_timeout, poll_frequency=self.poll_frequency).until(_new_content)
+            except TimeoutException:
+                complete = True
+                break
+            for tweet in new_tweets:
+                if len(tweets) >= limit:
+                    break
+                tweets[tweet['id']] = tweet
+        
+        return dict(result, count=len(tweets), tweets=list(tweets.values()), complete=complete,
+                    capped=len(tweets) >= limit, pages=pages)
+
+    def print_watchdog_stats(self):
+        """Вывод времени, потерянного на зависания и перезапуски браузера"""
+        recovery = self.metrics.snapshot()['histograms'].get('hang_recovery_seconds')
+        if not recovery or not recovery['count']:
+            return
+        print(f"Перезапусков браузера: {recovery['count']}, потеряно времени: {recovery['sum']:.1f} c "
+              f"(максимум {recovery['max']:.1f} c)")
+
+    def print_wait_stats(self):
+        """Вывод статистики времени ожидания результатов поиска"""
+        if not self.wait_timings:
+            return
+        timings = sorted(self.wait_timings)
+        print(f"Ожиданий: {len(timings)}, среднее: {sum(timings) / len(timings):.2f} c, "
+              f"медиана: {timings[len(timings) // 2]:.2f} c, максимум: {timings[-1]:.2f} c")
+
+    def first_search(self):
+        """Первый поиск для перехода на страницу выдачи"""
+        search_field = self.wait_for_element(FIRST_SEARCH_INPUT_XPATH)
         search_field.send_keys("1")
         search_field.send_keys(Keys.ENTER)
+        self.wait_for_element(SEARCH_INPUT_XPATH)
+
+    def ensure_search_ready(self):
+        """Авторизация и первый поиск при первом обращении к браузеру"""
+        if self.search_ready:
+            return
+        if not self.driver:
+            with self.metrics.timer('login'):
+                self.login(url=self.base_url + "/home", username="", password="")
+        # При поиске по URL строка поиска не нужна
+        if self.search_mode == 'input':
+            self.first_search()
+        self.search_ready = True
+
+    def search(self, query):
+        """Запуск поиска по запросу"""
+        if self.search_mode == 'url':
+            self.driver.get(build_search_url(query, self.search_tab, self.base_url))
+            return
+        
+        search_field = self.wait_for_element(SEARCH_INPUT_XPATH)
+        
+        # Выделение всего текста: COMMAND только на macOS
+        select_key = Keys.COMMAND if sys.platform == 'darwin' else Keys.CONTROL
+        actions = ActionChains(self.driver)
+        actions.click(search_field)
+        actions.key_down(select_key).send_keys("a").key_up(select_key)
+        actions.send_keys(Keys.BACKSPACE)
+        actions.perform()
+        
+        search_field.send_keys(query)
+        search_field.send_keys(Keys.ENTER)
+
+    def write_result(self, iteration, address, amount, count, status, latency=None, transferred=None):
+        """Запись результата по кошельку в выходной файл и в консоль"""
+        self.result_writer.write(iteration, address, amount, count, status, latency, transferred)
+        details = status if latency is None else f'{status}, {latency:.2f} c'
+        if transferred is not None:
+            details += f', {transferred / 1024:.0f} КБ'
+        print(f'#{iteration} address: {address} : {count} ({details})')
+
+    def search_wallet(self, wallet):
+        """Поиск по одному кошельку, результат дописывается в wallet"""
+        result, latency, transferred = self.run_query(wallet['query'], wallet['iteration'])
+        record = dict(wallet, count=result['count'], status=result['state'], latency=latency, transferred=transferred)
+        if result.get('capped'):
+            print(f"#{wallet['iteration']} Достигнут порог подсчета: не меньше {result['count']} твитов")
+        if result['state'] not in ('results', 'empty'):
+            return record
         
-        time.sleep(5)
+        previous = wallet.get('previous')
+        if previous is None:
+            record['last_tweet_id'] = max_tweet_id(result['tweets'])
+            return record
         
-        # Загружаем состояние
-        state = load_state()
+        # Складываем с сохраненным итогом только твиты новее последнего известного
+        last_id = previous['last_tweet_id']
+        new_tweets = [tweet for tweet in result['tweets']
+                      if not last_id or not str(tweet.get('id', '')).isdigit() or int(tweet['id']) > int(last_id)]
+        record['count'] = previous['count'] + len(new_tweets)
+        record['status'] = 'results' if record['count'] else 'empty'
+        record['last_tweet_id'] = max_tweet_id(new_tweets, last_id)
+        return record
+
+    def search_batch(self, wallets):
+        """
+        Поиск нескольких кошельков одним запросом "адрес1 OR адрес2 ...".
+        Пустая выдача закрывает все адреса сразу; если все твиты однозначно
+        относятся к адресам, а полнота выдачи доказана (прокрутка до конца или
+        ответ API без курсора следующей страницы), количество берется по совпадениям
+        в тексте. Иначе адреса ищутся по одному.
+        """
+        if len(wallets) == 1:
+            return [self.search_wallet(wallets[0])]
         
-        # Используем либо сохраненный счетчик, либо указанный в start_iteration
-        iteration_counter = max(state["iteration_counter"], start_iteration)
+        query = build_batch_query(wallets, self.search_since, self.search_until)
+        result, latency, transferred = self.run_query(query, wallets[0]['iteration'])
+        self.metrics.inc('batches')
         
-        # Пропускаем записи до нужной итерации
-        if start_iteration > 1:
-            print(f"Пропускаем {start_iteration - 1} записей...")
-            wallet_data = wallet_data[start_iteration - 1:]
+        if result['state'] == 'empty':
+            return [dict(wallet, query=query, count=0, status='empty', latency=latency, transferred=transferred)
+                    for wallet in wallets]
         
-        current_wallet_index = 0
+        # Неполная первая страница не доказывает конец выдачи: страница API бывает
+        # короче запрошенной при наличии следующей, а на странице видны только
+        # отрисованные твиты
+        complete = result.get('complete') or (result.get('source') == 'network' and not result.get('cursor'))
+        if result['state'] == 'results' and complete:
+            matches = attribute_tweets(result['tweets'], [wallet['address_key'] for wallet in wallets])
+            if matches is not None:
+                return [dict(wallet, query=query, count=len(matches[wallet['address_key']]),
+                             status='results' if matches[wallet['address_key']] else 'empty',
+                             last_tweet_id=max_tweet_id(matches[wallet['address_key']]),
+                             latency=latency, transferred=transferred)
+                        for wallet in wallets]
         
-        while current_wallet_index < len(wallet_data):
-            wallet_address, amount = wallet_data[current_wallet_index]
-            
-            # Обработка суммы: убираем запятые и дробную часть
-            amount_str = str(amount).replace(",", "")
-            if "." in amount_str:
-                amount_str = amount_str.split(".")[0]
-            
-            # Конвертируем в число
-            amount_value = int(amount_str)
-            
-            # Пропускаем, если сумма больше 500000
-            if amount_value > 500000:
-                print(f"#{iteration_counter} Пропускаем адрес {wallet_address} с суммой {amount_value} (больше 500000)")
-                iteration_counter += 1
+        # Неоднозначная выдача - ищем каждый адрес отдельно
+        print(f"#{wallets[0]['iteration']} Пакет из {len(wallets)} адресов: поиск по одному")
+        self.metrics.inc('batch_fallbacks')
+        return [self.search_wallet(wallet) for wallet in wallets]
+
+    def run_query(self, query, iteration_counter):
+        """
+        Поиск по запросу с повтором после сброса сессии, ожидания лимита
+        или перезапуска зависшего браузера.
+        Возвращает кортеж (результат, время ожидания, загружено байт).
+        """
+        restarts = 0
+        rate_limit_retries = 0
+        block_resets = 0
+        while True:
+            try:
+                self.ensure_search_ready()
                 
-                # Сохраняем текущее состояние
-                state["iteration_counter"] = iteration_counter
-                save_state(state)
+                # Темп с учетом оставшегося лимита запросов
+                self.rate_limiter.wait()
                 
-                current_wallet_index += 1
-                continue
+                search_started = time.perf_counter()
+                with self.metrics.timer('navigation'):
+                    self.search(query)
                 
-            try:
-                search_field = self.driver.find_element(By.XPATH, '''//*[@id="react-root"]/div/div/div[2]/main/div/div/div/div[1]/div/div[1]/div[1]/div[1]/div/div/div/div/div[2]/div[2]/div/div/div/form/div[1]/div/div/div/div/div[2]/div/input''')
-                time.sleep(1)
+                result, latency = self.wait_for_search_state(query)
+                if 'first_search' not in self.startup_timings:
+                    self.startup_timings['first_search'] = time.perf_counter() - search_started
+                    self.print_startup_stats()
+                self.purge_capture()
                 
-                actions = ActionChains(self.driver)
-                actions.click(search_field)
-                actions.key_down(Keys.COMMAND).send_keys("a").key_up(Keys.COMMAND)
-                actions.send_keys(Keys.BACKSPACE)
-                actions.perform()
-                time.sleep(1)
+                # Досчитываем выдачу прокруткой
+                if result['state'] == 'results' and self.count_mode == 'scroll':
+                    with self.metrics.timer('scroll'):
+                        result = self.scroll_results(query, result)
                 
-                search_field.send_keys(wallet_address)
-                search_field.send_keys(Keys.ENTER)
+                transferred = self.measure_transfer()
                 
-                time.sleep(5)
+                # Лимит запросов исчерпан - ждем его сброса без перезапуска сессии,
+                # после max_rate_limit_retries ожиданий подряд ошибка считается блокировкой
+                if (result['state'] == 'error' and self.rate_limiter.limited()
+                        and rate_limit_retries < self.max_rate_limit_retries):
+                    print(f'#{iteration_counter} Лимит запросов исчерпан, ожидание сброса...')
+                    self.metrics.inc('rate_limited')
+                    rate_limit_retries += 1
+                    continue
                 
-                elements = self.driver.find_elements(By.XPATH, '//*[@aria-label="Timeline: Search timeline"]')
-                if not elements:
+                # Сброс сессии не помогает max_block_resets раз подряд - адрес записывается с ошибкой
+                if result['state'] == 'error' and block_resets < self.max_block_resets:
+                    print(f'#{iteration_counter} Обнаружена спам-блокировка. Перезагрузка сессии...')
+                    self.metrics.inc('blocks')
+                    block_resets += 1
                     
-                    spam_block = self.driver.find_elements(By.XPATH, '/html/body/div[1]/div/div/div[2]/main/div/div/div/div/div/div[3]/div/button/div/span/span')
-                    if spam_block:
-                        try:
-                            if spam_block[0].text == 'Retry':
-                                print(f'#{iteration_counter} Обнаружена спам-блокировка. Перезагрузка сессии...')
-                                
-                                # Сохраняем текущее состояние перед сбросом
-                                state["iteration_counter"] = iteration_counter
-                                save_state(state)
-                                
-                                # Сбрасываем сессию
-                                self.reset_session()
-                                
-                                # Выполняем повторную авторизацию
-                                self.login(url="https://x.com/home", username="", password="")
-                                
-                                # Обновляем UI перед повторным поиском
-                                time.sleep(5)
-                                
-                                # делаем первый поиск после авторизации
-                                first_search = self.driver.find_element(By.XPATH, '''//*[@id="react-root"]/div/div/div[2]/main/div/div/div/div[2]/div/div[2]/div/div/div/div/div[1]/div/div/div/form/div[1]/div/div/div/div/div[2]/div/input''')
-                                first_search.send_keys("1")
-                                first_search.send_keys(Keys.ENTER)
-                                
-                                time.sleep(5)
-                                
-                                # Продолжаем с текущего адреса (не увеличиваем индекс)
-                                continue
-                        except Exception as e:
-                            print(f"#{iteration_counter} Ошибка при обработке спам-блока: {e}")
-                            pass
+                    # Сбрасываем сессию
+                    self.reset_session()
                     
-                    with open('output.csv', 'a', encoding='utf-8') as f:
-                        f.write(f'#{iteration_counter} address: {wallet_address} : {0}\n')
-                        print(f'#{iteration_counter} address: {wallet_address} : {0}')
+                    # Выполняем повторную авторизацию и первый поиск
+                    self.ensure_search_ready()
+                    
+                    # Продолжаем с текущего адреса
+                    continue
+                
+                if self.memory_check_every and latency is not None:
+                    self.memory_latencies.append(latency)
+                return result, latency, transferred
                         
-                    time.sleep(1)
-                else:
-                    res = elements[0].find_element(By.XPATH, './*').find_elements(By.XPATH, './*')
-                    with open('output.csv', 'a', encoding='utf-8') as f:
-                        f.write(f'#{iteration_counter} address: {wallet_address} : {len(res)-1}\n')
-                        print(f'#{iteration_counter} address: {wallet_address} : {len(res)-1}')
+            except BrowserFailure as e:
+                print(f'#{iteration_counter} Браузер завис или упал: {e}')
+                if restarts >= self.max_restarts:
+                    print(f'#{iteration_counter} Превышено число перезапусков браузера')
+                    return {'state': 'error', 'count': None, 'tweets': []}, None, None
+                restarts += 1
+                started = self.failure_started or time.perf_counter()
+                try:
+                    self.restart_driver()
+                except Exception as restart_error:
+                    print(f'#{iteration_counter} Ошибка перезапуска браузера: {restart_error}')
+                finally:
+                    # Потерянное время: от начала зависшей команды до готового браузера
+                    self.metrics.inc('browser_restarts')
+                    self.metrics.observe('hang_recovery', time.perf_counter() - started)
+                    self.failure_started = None
+                
+                # Повторяем тот же адрес
+                continue
                         
             except Exception as e:
                 print(f'#{iteration_counter} error: {e}')
                 
                 # Проверяем, возможно это ошибка из-за спам-блока
                 try:
-                    spam_block = self.driver.find_elements(By.XPATH, '/html/body/div[1]/div/div/div[2]/main/div/div/div/div/div/div[3]/div/button/div/span/span')
-                    if spam_block and spam_block[0].text == 'Retry':
+                    spam_block = self.driver.find_elements(By.XPATH, RETRY_BUTTON_XPATH)
+                    if spam_block and spam_block[0].text == 'Retry' and block_resets < self.max_block_resets:
                         print(f'#{iteration_counter} Обнаружена спам-блокировка после ошибки. Перезагрузка сессии...')
-                        
-                        # Сохраняем текущее состояние перед сбросом
-                        state["iteration_counter"] = iteration_counter
-                        save_state(state)
+                        self.metrics.inc('blocks')
+                        block_resets += 1
                         
                         # Сбрасываем сессию
                         self.reset_session()
                         
-                        # Выполняем повторную авторизацию
-                        self.login(url="https://x.com/home", username="", password="")
-                        
-                        # Обновляем UI перед повторным поиском
-                        time.sleep(5)
-                        
-                        # делаем первый поиск после авторизации
-                        first_search = self.driver.find_element(By.XPATH, '''//*[@id="react-root"]/div/div/div[2]/main/div/div/div/div[2]/div/div[2]/div/div/div/div/div[1]/div/div/div/form/div[1]/div/div/div/div/div[2]/div/input''')
-                        first_search.send_keys("1")
-                        first_search.send_keys(Keys.ENTER)
+                        # Выполняем повторную авторизацию и первый поиск
+                        self.ensure_search_ready()
                         
-                        time.sleep(5)
-                        
-                        # Продолжаем с текущего адреса (не увеличиваем индекс)
+                        # Продолжаем с текущего адреса
                         continue
                 except:
                     pass
+                
+                return {'state': 'error', 'count': None, 'tweets': []}, None, None
+
+    def parse_data(self, wallet_data, start_iteration=1):
+        """
+        Метод для парсинга данных.
+        Конвейер: чтение адресов, запись результатов и журнала прогресса работают
+        в фоновых потоках, браузер в текущем потоке занят только поиском.
+        Очереди между этапами ограничены queue_size.
+        """
+        # Пропускаем записи до нужной итерации
+        if start_iteration > 1:
+            print(f"Пропускаем {start_iteration - 1} записей...")
+        
+        search_queue = queue.Queue(maxsize=self.queue_size)
+        result_queue = queue.Queue(maxsize=self.queue_size)
+        checkpoint_queue = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        # Чтение входного файла дошло до конца без ошибок
+        input_exhausted = threading.Event()
+        counters = {'read': 0, 'cache_hits': 0, 'already_done': 0, 'rechecks': 0}
+        errors = []
+        
+        def read_stage():
+            """Этап чтения: отбор адресов, ответы из кэша сразу идут на запись"""
+            seen_addresses = set()
+            # wallet_data - итератор кортежей (номер строки, адрес, сумма), уже отфильтрованный при чтении
+            for iteration_counter, wallet_address, amount_value in wallet_data:
+                if stop.is_set():
+                    return
+                counters['read'] += 1
+                if iteration_counter < start_iteration:
+                    continue
+                
+                # Пропускаем повторы адреса в файле
+                address_key = normalize_address(wallet_address)
+                if address_key in seen_addresses:
+                    print(f"#{iteration_counter} Пропускаем повтор адреса {wallet_address}")
+                    continue
+                seen_addresses.add(address_key)
+                
+                # Пропускаем адреса, обработанные до остановки прошлого запуска
+                if self.progress_journal is not None and self.progress_journal.is_done(address_key):
+                    counters['already_done'] += 1
+                    continue
+                
+                wallet = {
+                    'iteration': iteration_counter,
+                    'address': wallet_address,
+                    'amount': amount_value,
+                    'address_key': address_key,
+                    'query': build_search_query(wallet_address, self.search_since, self.search_until),
+                }
+                
+                # Адреса, найденные ранее, в браузер не попадают
+                cached = None
+                if self.result_cache is not None:
+                    cached = self.result_cache.get(address_key, include_expired=self.incremental)
+                
+                # Инкрементальный режим: устаревший результат дополняется твитами новее сохраненных
+                if cached is not None and self.incremental and (cached['expired'] or self.result_cache.ttl is None):
+                    wallet['previous'] = cached
+                    wallet['query'] = build_search_query(
+                        wallet_address, self.search_since, self.search_until,
+                        since_id=cached['last_tweet_id'], since_time=cached['checked_at']
+                    )
+                    counters['rechecks'] += 1
+                    if not put_item(search_queue, wallet, lambda: not stop.is_set()):
+                        return
+                elif cached is not None:
+                    counters['cache_hits'] += 1
+                    record = dict(wallet, count=cached['count'], status='cached', latency=None, transferred=None)
+                    if not put_item(result_queue, record, lambda: not stop.is_set()):
+                        return
+                elif not put_item(search_queue, wallet, lambda: not stop.is_set()):
+                    return
+            input_exhausted.set()
+        
+        def write_stage():
+            """Этап записи: результаты в файл и кэш, записанные на диск адреса - в журнал"""
+            written = []
+            while True:
+                try:
+                    record = result_queue.get(timeout=self.result_writer.flush_interval)
+                except queue.Empty:
+                    record = None
+                    self.result_writer.flush()
+                
+                if record is PIPELINE_END:
+                    break
+                if record is not None:
+                    with self.metrics.timer('write'):
+                        self.write_result(record['iteration'], record['address'], record['amount'], record['count'],
+                                          record['status'], record['latency'], record['transferred'])
+                        if self.result_cache is not None and record['status'] in ('results', 'empty'):
+                            self.result_cache.put(record['address_key'], record['count'], record['query'],
+                                                  record.get('last_tweet_id'))
+                    self.metrics.inc('wallets')
+                    if record['status'] == 'error':
+                        self.metrics.inc('errors')
+                    if record['status'] in COMPLETED_STATUSES:
+                        written.append((record['address_key'], record['iteration']))
+                
+                self.metrics.maybe_export(self.driver)
+                
+                # Буфер сброшен на диск - адреса можно отмечать в журнале
+                if written and not self.result_writer.buffer:
+                    put_item(checkpoint_queue, written, checkpoint_thread.is_alive)
+                    written = []
             
-            # Увеличиваем счетчик после обработки каждого кошелька
-            iteration_counter += 1
-            
-            # Сохраняем текущее состояние
-            state["iteration_counter"] = iteration_counter
-            save_state(state)
-            
-            # Переходим к следующему кошельку
-            current_wallet_index += 1
+            self.result_writer.flush()
+            if written:
+                put_item(checkpoint_queue, written, checkpoint_thread.is_alive)
+            put_item(checkpoint_queue, PIPELINE_END, checkpoint_thread.is_alive)
+        
+        def checkpoint_stage():
+            """Этап журнала: отметка обработанных адресов и периодическая запись на диск"""
+            while True:
+                batch = checkpoint_queue.get()
+                if batch is PIPELINE_END:
+                    break
+                if self.progress_journal is None:
+                    continue
+                with self.metrics.timer('checkpoint'):
+                    for address_key, iteration in batch:
+                        self.progress_journal.mark_done(address_key, iteration)
+                    if self.progress_journal.checkpoint_due():
+                        self.progress_journal.checkpoint()
+            if self.progress_journal is not None:
+                self.progress_journal.checkpoint()
+        
+        def start_stage(target, name):
+            def run():
+                try:
+                    target()
+                except BaseException as e:
+                    errors.append(e)
+                    stop.set()
+            thread = threading.Thread(target=run, name=name, daemon=True)
+            thread.start()
+            return thread
+        
+        checkpoint_thread = start_stage(checkpoint_stage, 'checkpoint')
+        writer_thread = start_stage(write_stage, 'writer')
+        reader_thread = start_stage(read_stage, 'reader')
+        
+        completed = False
+        pending = None
+        try:
+            # Этап браузера: только навигация и разбор выдачи
+            while not stop.is_set():
+                if pending is not None:
+                    wallet, pending = pending, None
+                else:
+                    try:
+                        wallet = search_queue.get(timeout=0.5)
+                    except queue.Empty:
+                        if not reader_thread.is_alive() and search_queue.empty():
+                            completed = input_exhausted.is_set() and not stop.is_set()
+                            break
+                        continue
+                
+                # Набираем пакет адресов в пределах длины запроса
+                # (инкрементальные проверки со своими фильтрами ищутся по одному)
+                batch = [wallet]
+                while len(batch) < self.batch_size and 'previous' not in batch[0]:
+                    try:
+                        wallet = search_queue.get(timeout=0.05)
+                    except queue.Empty:
+                        break
+                    if ('previous' in wallet or
+                            len(build_batch_query(batch + [wallet], self.search_since, self.search_until)) > self.max_query_length):
+                        pending = wallet
+                        break
+                    batch.append(wallet)
+                
+                commands_before = self.metrics.counters['webdriver_commands']
+                records = self.search_batch(batch)
+                commands = self.metrics.counters['webdriver_commands'] - commands_before
+                for record in records:
+                    self.metrics.observe_value('webdriver_commands_per_wallet', commands / len(records))
+                
+                if not all(put_item(result_queue, record, writer_thread.is_alive) for record in records):
+                    break
+                
+                # Замер памяти и пересоздание вкладки - после передачи результатов на запись
+                self.check_browser_memory()
+        finally:
+            stop.set()
+            reader_thread.join()
+            put_item(result_queue, PIPELINE_END, writer_thread.is_alive)
+            writer_thread.join()
+            checkpoint_thread.join()
+        
+        if errors:
+            raise errors[0]
+        
+        # Весь входной файл прочитан и обработан - журнал для продолжения больше не нужен
+        if completed and not errors and self.progress_journal is not None:
+            self.progress_journal.finish()
+        
+        if not counters['read']:
+            print("No wallet addresses found in the CSV file.")
+        if counters['already_done']:
+            print(f"Обработано в прошлом запуске: {counters['already_done']}")
+        if counters['cache_hits']:
+            print(f"Взято из кэша: {counters['cache_hits']}")
+        if counters['rechecks']:
+            print(f"Инкрементальных проверок: {counters['rechecks']}")
+        self.print_wait_stats()
+        self.rate_limiter.print_stats()
+        self.print_capture_stats()
+        self.print_transfer_stats()
+        self.print_watchdog_stats()
+        self.metrics.export(self.driver)
+        self.metrics.print_stats()
     
     def close(self):
-        """Закрытие браузера"""
+        """Закрытие браузера, выходного файла и журнала прогресса"""
+        self.result_writer.close()
+        if self.progress_journal is not None:
+            self.progress_journal.close()
         if self.driver:
             self.driver.quit()
 
     
-    def read_wallet_addresses(self, csv_file):
+    def read_wallet_addresses(self, csv_file, max_amount=500000, chunk_size=10000):
         """
-        Read data from the first two columns of a CSV file.
-        Returns a list of tuples: (first_column_value, second_column_value)
+        Read data from the first two columns of a CSV file in chunks.
+        Rows with invalid addresses, unparsable amounts or amounts above max_amount
+        are dropped at load time.
+        Returns an iterator of tuples: (row_number, address, amount).
+        Raises FileNotFoundError for a missing file; read errors are raised while iterating.
         """
         # Проверяем существование файла
         if not os.path.exists(csv_file):
-            print(f"Файл {csv_file} не существует.")
-            return []
-            
+            raise FileNotFoundError(f"Файл {csv_file} не существует.")
+        
+        return self._iter_wallet_chunks(csv_file, max_amount, chunk_size)
+    
+    def _iter_wallet_chunks(self, csv_file, max_amount, chunk_size):
+        """Потоковое чтение и фильтрация CSV-файла по частям"""
+        import numpy as np
+        import pandas as pd
+        
+        skipped = {'invalid_address': 0, 'invalid_amount': 0, 'above_max_amount': 0}
         try:
-            # Читаем только две первые колонки
-            df = pd.read_csv(csv_file, usecols=[0, 1])
+            # Читаем только две первые колонки, все значения как строки
+            chunks = pd.read_csv(csv_file, usecols=[0, 1], dtype=str, chunksize=chunk_size)
+            row_offset = 1
+            for chunk in chunks:
+                # Номер строки совпадает с номером итерации (считая с 1)
+                chunk.index = pd.RangeIndex(row_offset, row_offset + len(chunk))
+                row_offset += len(chunk)
+                
+                addresses = chunk.iloc[:, 0].fillna('').str.strip()
+                
+                # Обработка суммы: убираем запятые и дробную часть
+                amounts = pd.to_numeric(chunk.iloc[:, 1].str.replace(',', '', regex=False).str.strip(), errors='coerce')
+                amounts = np.trunc(amounts)
+                
+                valid_address = addresses.str.fullmatch(WALLET_ADDRESS_PATTERN)
+                valid_amount = amounts.notna()
+                below_max = amounts <= max_amount if max_amount is not None else valid_amount
+                
+                skipped['invalid_address'] += int((~valid_address).sum())
+                skipped['invalid_amount'] += int((valid_address & ~valid_amount).sum())
+                skipped['above_max_amount'] += int((valid_address & valid_amount & ~below_max).sum())
+                
+                keep = valid_address & valid_amount & below_max
+                rows = zip(chunk.index[keep], addresses[keep], amounts[keep].astype('int64'))
+                for row_number, address, amount in rows:
+                    yield int(row_number), address, int(amount)
+        
+        finally:
+            print(f"Пропущено строк: неверный адрес - {skipped['invalid_address']}, "
+                  f"неверная сумма - {skipped['invalid_amount']}, "
+                  f"сумма больше {max_amount} - {skipped['above_max_amount']}")
             
-            # Проверим, что обе колонки есть
-            if df.shape[1] < 2:
-                print("CSV file does not contain at least two columns.")
-                return []
             
-            # Преобразуем в список кортежей
-            two_columns = list(df.itertuples(index=False, name=None))
-            return two_columns
+def put_item(target_queue, item, alive):
+    """Помещение в ограниченную очередь, пока alive() сообщает, что этап-получатель работает"""
+    while alive():
+        try:
+            target_queue.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            continue
+    return False
 
-        except Exception as e:
-            print(f"Error reading CSV file: {e}")
-            return []
-            
-            
-def load_state():
-    """Загрузка состояния из JSON-файла"""
-    state_file = 'parser_state.json'
-    default_state = {"iteration_counter": 1}
+
+def build_search_query(text, since=None, until=None, since_id=None, since_time=None):
+    """Строка поиска с фильтрами по датам (YYYY-MM-DD), ID твита и времени (unix)"""
+    query = str(text).strip()
+    if since:
+        query += f' since:{since}'
+    if until:
+        query += f' until:{until}'
+    if since_id:
+        query += f' since_id:{since_id}'
+    elif since_time:
+        query += f' since_time:{int(since_time)}'
+    return query
+
+
+def max_tweet_id(tweets, current=None):
+    """Наибольший ID твита (ID сравниваются как числа)"""
+    ids = [int(tweet['id']) for tweet in tweets if str(tweet.get('id', '')).isdigit()]
+    if current:
+        ids.append(int(current))
+    return str(max(ids)) if ids else None
+
+
+def build_search_url(query, tab='top', base_url=BASE_URL):
+    """URL страницы поиска для запроса и вкладки (top/latest)"""
+    params = {'q': query, 'src': 'typed_query'}
+    if tab == 'latest':
+        params['f'] = 'live'
+    return base_url + '/search?' + urlencode(params)
+
+
+def search_request_variables(request):
+    """Параметр variables запроса SearchTimeline (GET или POST)"""
+    try:
+        if request.method == 'POST':
+            return json.loads(request.body).get('variables') or {}
+        return json.loads(request.params.get('variables', '{}'))
+    except (ValueError, AttributeError):
+        return {}
+
+
+def parse_search_timeline(payload):
+    """
+    Разбор JSON ответа SearchTimeline: твиты (ID и время) и курсор следующей страницы.
+    None - ответ незнакомого формата, состояние выдачи определяется по странице.
+    """
+    result = {'state': 'empty', 'count': 0, 'tweets': [], 'cursor': None}
+    try:
+        instructions = payload['data']['search_by_raw_query']['search_timeline']['timeline']['instructions']
+    except (KeyError, TypeError):
+        # Ошибкой считается только явный лимит запросов, остальное решает разбор страницы
+        errors = payload.get('errors') if isinstance(payload, dict) else None
+        if errors and any(isinstance(error, dict) and error.get('code') == RATE_LIMIT_ERROR_CODE for error in errors):
+            result['state'] = 'error'
+            return result
+        return None
     
-    if os.path.exists(state_file):
+    entries = []
+    for instruction in instructions:
+        if instruction.get('type') == 'TimelineAddEntries':
+            entries.extend(instruction.get('entries', []))
+        elif instruction.get('type') == 'TimelineReplaceEntry':
+            entries.append(instruction.get('entry', {}))
+    
+    seen = set()
+    for entry in entries:
+        entry_id = entry.get('entryId', '')
+        content = entry.get('content', {})
+        if entry_id.startswith('tweet-'):
+            tweet_id = entry_id[len('tweet-'):]
+            if tweet_id in seen:
+                continue
+            seen.add(tweet_id)
+            tweet = content.get('itemContent', {}).get('tweet_results', {}).get('result', {})
+            # Твиты с ограниченной видимостью вложены еще на уровень
+            tweet = tweet.get('tweet', tweet)
+            result['tweets'].append({
+                'id': tweet_id,
+                'time': tweet.get('legacy', {}).get('created_at'),
+                'text': tweet_text(tweet),
+            })
+        elif content.get('cursorType') == 'Bottom':
+            result['cursor'] = content.get('value')
+    
+    result['count'] = len(result['tweets'])
+    if result['count']:
+        result['state'] = 'results'
+    return result
+
+
+def tweet_text(tweet):
+    """Текст твита из ответа API вместе с длинной версией и раскрытыми ссылками"""
+    legacy = tweet.get('legacy', {})
+    parts = [legacy.get('full_text', '')]
+    note = tweet.get('note_tweet', {}).get('note_tweet_results', {}).get('result', {})
+    parts.append(note.get('text', ''))
+    for url in legacy.get('entities', {}).get('urls', []):
+        parts.append(url.get('expanded_url', ''))
+    return '\n'.join(part for part in parts if part)
+
+
+def build_batch_query(wallets, since=None, until=None):
+    """Запрос для пакета кошельков: адреса через OR и фильтры по датам"""
+    return build_search_query(' OR '.join(wallet['address'] for wallet in wallets), since, until)
+
+
+def attribute_tweets(tweets, address_keys):
+    """
+    Твиты по каждому адресу по совпадению в тексте.
+    None, если какой-то твит не удалось отнести ни к одному адресу.
+    """
+    matches = {address_key: [] for address_key in address_keys}
+    for tweet in tweets:
+        text = tweet.get('text') or ''
+        text_lower = text.lower()
+        matched = False
+        for address_key in address_keys:
+            # Нормализованные EVM-адреса в нижнем регистре, остальные - как есть
+            haystack = text_lower if address_key.startswith('0x') else text
+            if address_key in haystack:
+                matches[address_key].append(tweet)
+                matched = True
+        if not matched:
+            return None
+    return matches
+
+
+def normalize_address(address):
+    """Приведение адреса кошелька к единому виду для сравнения"""
+    address = str(address).strip()
+    # EVM-адреса регистронезависимы, остальные (base58 и т.п.) оставляем как есть
+    if address[:2].lower() == '0x':
+        return address.lower()
+    return address
+
+
+class ProgressJournal:
+    """Журнал обработанных адресов: дозапись строк JSON и периодическое сжатие"""
+
+    def __init__(self, journal_file='parser_progress.jsonl', checkpoint_every=10, compact_every=1000):
+        self.journal_file = journal_file
+        # Запись журнала на диск каждые N адресов
+        self.checkpoint_every = checkpoint_every
+        # Перезапись журнала без мусора каждые N записанных строк
+        self.compact_every = compact_every
+        self.completed = {}
+        self.pending = []
+        self.appended = 0
+        self.file = None
+        self._load()
+
+    def _load(self):
+        """Чтение журнала; оборванные и повторяющиеся строки отбрасываются сжатием"""
+        if not os.path.exists(self.journal_file):
+            return
+        lines = 0
+        with open(self.journal_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                lines += 1
+                try:
+                    entry = json.loads(line)
+                    self.completed[entry['address']] = entry['iteration']
+                except (ValueError, KeyError, TypeError):
+                    continue
+        if self.completed:
+            print(f"Загружен журнал прогресса: {len(self.completed)} адресов")
+        if lines != len(self.completed):
+            self.compact()
+
+    def is_done(self, address):
+        """Проверка, обработан ли адрес"""
+        return address in self.completed
+
+    def mark_done(self, address, iteration):
+        """Отметка адреса как обработанного (запись на диск при checkpoint)"""
+        self.completed[address] = iteration
+        self.pending.append({'address': address, 'iteration': iteration})
+
+    def checkpoint_due(self):
+        """Пора ли записывать журнал на диск"""
+        return len(self.pending) >= self.checkpoint_every
+
+    def checkpoint(self):
+        """Дозапись накопленных строк в журнал"""
+        if not self.pending:
+            return
+        if self.file is None:
+            self.file = open(self.journal_file, 'a', encoding='utf-8')
+        self.file.writelines(json.dumps(entry) + '\n' for entry in self.pending)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.appended += len(self.pending)
+        self.pending = []
+        if self.appended >= self.compact_every:
+            self.compact()
+
+    def compact(self):
+        """Атомарная перезапись журнала: временный файл и переименование"""
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        tmp_file = self.journal_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            for address, iteration in self.completed.items():
+                f.write(json.dumps({'address': address, 'iteration': iteration}) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.journal_file)
+        # Ожидающие записи уже попали в сжатый журнал
+        self.pending = []
+        self.appended = 0
+
+    def finish(self):
+        """Удаление журнала после полной обработки входного файла"""
+        self.close()
+        if os.path.exists(self.journal_file):
+            os.remove(self.journal_file)
+        self.completed = {}
+
+    def close(self):
+        """Запись накопленных строк и закрытие журнала"""
+        self.checkpoint()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class Metrics:
+    """Метрики запуска: гистограммы времени этапов, счетчики, память; экспорт в JSON lines или Prometheus"""
+
+    BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+    COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+    def __init__(self, export_file=None, export_format='jsonl', export_interval=60):
+        self.export_file = export_file
+        # jsonl - строка со снимком метрик на каждый экспорт, prometheus - файл для textfile collector
+        self.export_format = export_format
+        self.export_interval = export_interval
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.last_export = time.monotonic()
+        self.histograms = {}
+        self.counters = {
+            'wallets': 0, 'errors': 0, 'blocks': 0, 'rate_limited': 0, 'webdriver_commands': 0,
+            'batches': 0, 'batch_fallbacks': 0, 'browser_restarts': 0, 'recycles': 0,
+        }
+        # Последний замер памяти вкладки (JS heap, узлы DOM)
+        self.browser_memory = {}
+
+    @contextmanager
+    def timer(self, stage):
+        """Замер времени этапа"""
+        started = time.perf_counter()
         try:
-            with open(state_file, 'r') as f:
-                return json.load(f)
-        except Exception as e:
-            print(f"Ошибка при загрузке состояния: {e}")
-            return default_state
-    else:
-        # Создаем файл с состоянием по умолчанию
-        with open(state_file, 'w') as f:
-            json.dump(default_state, f, indent=4)
-        return default_state
-        
-def save_state(state):
-    """Сохранение состояния в JSON-файл"""
-    state_file = 'parser_state.json'
-    try:
-        with open(state_file, 'w') as f:
-            json.dump(state, f, indent=4)
-    except Exception as e:
-        print(f"Ошибка при сохранении состояния: {e}")
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+
+    def observe(self, stage, seconds):
+        """Учет длительности этапа (секунды)"""
+        self._observe(stage + '_seconds', seconds, self.BUCKETS)
+
+    def observe_value(self, name, value):
+        """Учет значения-количества"""
+        self._observe(name, value, self.COUNT_BUCKETS)
+
+    def _observe(self, name, value, buckets):
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = {
+                    'buckets': buckets, 'counts': [0] * len(buckets), 'count': 0, 'sum': 0.0, 'max': 0.0,
+                }
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram['counts'][i] += 1
+            histogram['count'] += 1
+            histogram['sum'] += value
+            histogram['max'] = max(histogram['max'], value)
+
+    def inc(self, counter, value=1):
+        """Увеличение счетчика"""
+        with self.lock:
+            self.counters[counter] = self.counters.get(counter, 0) + value
+
+    def memory(self, driver=None):
+        """
+        Память Python (пиковый RSS), Chrome (RSS процессов браузера, если установлен psutil)
+        и последний замер вкладки через CDP
+        """
+        memory = {}
+        # Модуль resource есть только в Unix; ru_maxrss в Linux в килобайтах, в macOS в байтах
+        try:
+            import resource
+            max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            memory['python_max_rss_bytes'] = max_rss if sys.platform == 'darwin' else max_rss * 1024
+        except ImportError:
+            pass
+        service = getattr(driver, 'service', None)
+        process = getattr(service, 'process', None)
+        if process is not None:
+            # psutil - необязательная зависимость
+            try:
+                import psutil
+                chromedriver = psutil.Process(process.pid)
+                memory['chrome_rss_bytes'] = sum(child.memory_info().rss for child in chromedriver.children(recursive=True))
+            except Exception:
+                pass
+        with self.lock:
+            memory.update(self.browser_memory)
+        return memory
+
+    def set_browser_memory(self, sample):
+        """Сохранение замера памяти вкладки для экспорта"""
+        with self.lock:
+            self.browser_memory = dict(sample)
+
+    def snapshot(self, driver=None):
+        """Текущие значения всех метрик"""
+        with self.lock:
+            elapsed = time.time() - self.started
+            snapshot = {
+                'timestamp': datetime.now(timezone.utc).isoformat(),
+                'elapsed_seconds': round(elapsed, 3),
+                'wallets_per_second': round(self.counters['wallets'] / elapsed, 4) if elapsed else 0,
+                'counters': dict(self.counters),
+                'histograms': {
+                    name: {
+                        'count': h['count'],
+                        'sum': round(h['sum'], 6),
+                        'max': round(h['max'], 6),
+                        'buckets': {str(bound): count for bound, count in zip(h['buckets'], h['counts'])},
+                    }
+                    for name, h in self.histograms.items()
+                },
+            }
+        snapshot['memory'] = self.memory(driver)
+        return snapshot
+
+    def maybe_export(self, driver=None):
+        """Экспорт, если прошел интервал"""
+        if self.export_file and time.monotonic() - self.last_export >= self.export_interval:
+            self.export(driver)
+
+    def export(self, driver=None):
+        """Запись метрик в файл"""
+        self.last_export = time.monotonic()
+        if not self.export_file:
+            return
+        snapshot = self.snapshot(driver)
+        if self.export_format == 'jsonl':
+            with open(self.export_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(snapshot) + '\n')
+            return
+        
+        lines = [
+            '# TYPE parser_wallets_per_second gauge',
+            f"parser_wallets_per_second {snapshot['wallets_per_second']}",
+        ]
+        for name, value in snapshot['counters'].items():
+            lines += [f'# TYPE parser_{name}_total counter', f'parser_{name}_total {value}']
+        for name, value in snapshot['memory'].items():
+            lines += [f'# TYPE parser_{name} gauge', f'parser_{name} {value}']
+        for name, h in snapshot['histograms'].items():
+            lines.append(f'# TYPE parser_{name} histogram')
+            for bound, count in h['buckets'].items():
+                lines.append(f'parser_{name}_bucket{{le="{bound}"}} {count}')
+            lines.append(f'parser_{name}_bucket{{le="+Inf"}} {h["count"]}')
+            lines.append(f'parser_{name}_sum {h["sum"]}')
+            lines.append(f'parser_{name}_count {h["count"]}')
+        
+        # Атомарная замена, чтобы сборщик не прочитал недописанный файл
+        tmp_file = self.export_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(tmp_file, self.export_file)
+
+    def print_stats(self):
+        """Вывод сводки по этапам и счетчикам"""
+        snapshot = self.snapshot()
+        print(f"Кошельков/с: {snapshot['wallets_per_second']:.3f}, " +
+              ", ".join(f"{name}: {value}" for name, value in snapshot['counters'].items()))
+        for name, h in snapshot['histograms'].items():
+            if h['count']:
+                print(f"  {name}: {h['count']} раз, среднее {h['sum'] / h['count']:.3f}, максимум {h['max']:.3f}")
+
+
+class RateLimiter:
+    """Темп запросов поиска по заголовкам x-rate-limit-* и ответам 429"""
+
+    def __init__(self, min_interval=0, reserve=1, slowdown_ratio=0.2, backoff=60, report_every=50):
+        # Минимальный интервал между поисками (секунды)
+        self.min_interval = min_interval
+        # Сколько запросов оставлять в запасе до сброса лимита
+        self.reserve = reserve
+        # Доля оставшегося лимита, ниже которой запросы распределяются до сброса
+        self.slowdown_ratio = slowdown_ratio
+        # Ожидание после 429 без заголовка сброса (секунды, удваивается)
+        self.backoff = backoff
+        self.report_every = report_every
+        self.limit = None
+        self.remaining = None
+        self.reset_at = None
+        self.throttled = False
+        self.failures = 0
+        self.last_request = None
+        self.requests = deque()
+        self.total_requests = 0
+        self.total_wait = 0.0
+
+    def observe(self, status_code, headers):
+        """Учет ответа сервера: заголовки лимита и код 429"""
+        try:
+            if headers.get('x-rate-limit-limit') is not None:
+                self.limit = int(headers.get('x-rate-limit-limit'))
+            if headers.get('x-rate-limit-remaining') is not None:
+                self.remaining = int(headers.get('x-rate-limit-remaining'))
+            if headers.get('x-rate-limit-reset') is not None:
+                self.reset_at = float(headers.get('x-rate-limit-reset'))
+        except ValueError:
+            pass
+        self.throttled = status_code == 429
+        if self.throttled:
+            self.failures += 1
+        else:
+            self.failures = 0
+
+    def limited(self):
+        """Исчерпан ли лимит запросов"""
+        return self.throttled or (self.remaining is not None and self.remaining <= 0)
+
+    def expire(self, now):
+        """Сброс исчерпанного лимита, время сброса которого уже прошло (429 ждет по backoff)"""
+        if not self.throttled and self.limited() and self.reset_at is not None and now >= self.reset_at:
+            self.remaining = None
+            self.reset_at = None
+
+    def delay(self):
+        """Пауза перед следующим запросом (секунды)"""
+        now = time.time()
+        self.expire(now)
+        reset_in = self.reset_at - now if self.reset_at is not None else None
+        
+        if self.limited():
+            if reset_in is not None and reset_in > 0:
+                return reset_in + 1
+            if self.throttled:
+                return self.backoff * 2 ** (self.failures - 1)
+            return 0
+        
+        delay = 0
+        if self.last_request is not None:
+            delay = max(0, self.min_interval - (now - self.last_request))
+        
+        # Мало запросов в запасе - распределяем оставшиеся до сброса окна
+        if (self.remaining is not None and self.limit and reset_in is not None and reset_in > 0
+                and self.remaining < self.limit * self.slowdown_ratio):
+            spread = reset_in / max(self.remaining - self.reserve, 1)
+            delay = max(delay, spread)
+        return delay
+
+    def wait(self):
+        """Ожидание перед запросом и учет фактического темпа"""
+        delay = self.delay()
+        if delay > 0:
+            if delay >= 5:
+                print(f"Пауза {delay:.0f} c до следующего поиска (лимит: {self.remaining}/{self.limit})")
+            time.sleep(delay)
+            self.total_wait += delay
+        if self.limited():
+            # Окно лимита прошло (или истекло до паузы) - ждем новые заголовки
+            self.throttled = False
+            self.remaining = None
+        
+        now = time.time()
+        self.last_request = now
+        self.requests.append(now)
+        self.total_requests += 1
+        while self.requests and now - self.requests[0] > 60:
+            self.requests.popleft()
+        
+        if self.report_every and self.total_requests % self.report_every == 0:
+            print(f"Темп поиска: {self.rate():.1f} запросов/мин (лимит: {self.remaining}/{self.limit})")
+
+    def rate(self):
+        """Фактический темп за последнюю минуту (запросов в минуту)"""
+        if len(self.requests) < 2:
+            return float(len(self.requests))
+        window = self.requests[-1] - self.requests[0]
+        return (len(self.requests) - 1) / window * 60 if window > 0 else float(len(self.requests))
+
+    def print_stats(self):
+        """Вывод статистики темпа"""
+        if not self.total_requests:
+            return
+        print(f"Поисков: {self.total_requests}, темп: {self.rate():.1f} запросов/мин, "
+              f"пауз по лимиту: {self.total_wait:.0f} c")
+
+
+class ResultCache:
+    """Локальное хранилище результатов поиска по адресам кошельков (SQLite)"""
+
+    def __init__(self, db_file='results.db', ttl=None):
+        self.db_file = db_file
+        # Время жизни записи в секундах (None - бессрочно)
+        self.ttl = ttl
+        # Чтение и запись идут из разных потоков конвейера
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS results ('
+            'address TEXT NOT NULL, '
+            'count INTEGER NOT NULL, '
+            'checked_at REAL NOT NULL, '
+            'query TEXT, '
+            'last_tweet_id TEXT)'
+        )
+        # Базы, созданные до появления last_tweet_id
+        columns = [row[1] for row in self.conn.execute('PRAGMA table_info(results)')]
+        if 'last_tweet_id' not in columns:
+            self.conn.execute('ALTER TABLE results ADD COLUMN last_tweet_id TEXT')
+        self.conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS results_address ON results (address)')
+        self.conn.commit()
+
+    def get(self, address, include_expired=False):
+        """Получение сохраненного результата по нормализованному адресу"""
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT count, checked_at, query, last_tweet_id FROM results WHERE address = ?', (address,)
+            ).fetchone()
+        if row is None:
+            return None
+        count, checked_at, query, last_tweet_id = row
+        expired = self.ttl is not None and time.time() - checked_at > self.ttl
+        if expired and not include_expired:
+            return None
+        return {'count': count, 'checked_at': checked_at, 'query': query, 'last_tweet_id': last_tweet_id, 'expired': expired}
+
+    def put(self, address, count, query, last_tweet_id=None):
+        """Сохранение результата поиска по нормализованному адресу"""
+        with self.lock:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO results (address, count, checked_at, query, last_tweet_id) VALUES (?, ?, ?, ?, ?)',
+                (address, count, time.time(), query, last_tweet_id)
+            )
+            self.conn.commit()
+
+    def close(self):
+        """Закрытие базы данных"""
+        self.conn.close()
+
+
+class ResultWriter:
+    """Буферизованная запись результатов в CSV или Parquet"""
+
+    COLUMNS = ['iteration', 'address', 'amount', 'count', 'status', 'latency', 'bytes', 'timestamp']
+
+    def __init__(self, output_file='output.csv', output_format='csv', flush_rows=100, flush_interval=30):
+        if output_format not in ('csv', 'parquet'):
+            raise ValueError(f"Неизвестный формат вывода: {output_format}")
+        self.output_file = output_file
+        self.output_format = output_format
+        # Сброс буфера на диск по количеству строк или по времени (секунды)
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.buffer = []
+        self.last_flush = time.monotonic()
+        self.parquet_writer = None
+        # Файл, в который фактически пишет этот запуск (output_file или новый файл-часть)
+        self.target_file = None
+
+    def write(self, iteration, address, amount, count, status, latency=None, transferred=None):
+        """Добавление строки результата в буфер"""
+        self.buffer.append({
+            'iteration': iteration,
+            'address': address,
+            'amount': amount,
+            'count': count,
+            'status': status,
+            'latency': round(latency, 3) if latency is not None else None,
+            'bytes': transferred,
+            'timestamp': datetime.now(timezone.utc),
+        })
+        if len(self.buffer) >= self.flush_rows or time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Запись накопленных строк в файл"""
+        self.last_flush = time.monotonic()
+        if not self.buffer:
+            return
+        rows, self.buffer = self.buffer, []
+        if self.output_format == 'csv':
+            self._write_csv(rows)
+        else:
+            self._write_parquet(rows)
+
+    def _write_csv(self, rows):
+        """Дозапись строк в CSV с заголовком для нового файла"""
+        if self.target_file is None:
+            self.target_file = self._csv_target_file()
+        write_header = not os.path.exists(self.target_file) or os.path.getsize(self.target_file) == 0
+        with open(self.target_file, 'a', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=self.COLUMNS)
+            if write_header:
+                writer.writeheader()
+            for row in rows:
+                writer.writerow(dict(row, timestamp=row['timestamp'].isoformat()))
+
+    def _write_parquet(self, rows):
+        """Запись строк очередной группой в Parquet-файл"""
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Для формата parquet установите пакет pyarrow")
+
+        schema = pa.schema([
+            ('iteration', pa.int64()),
+            ('address', pa.string()),
+            ('amount', pa.int64()),
+            ('count', pa.int64()),
+            ('status', pa.string()),
+            ('latency', pa.float64()),
+            ('bytes', pa.int64()),
+            ('timestamp', pa.timestamp('ms', tz='UTC')),
+        ])
+        if self.parquet_writer is None:
+            # Parquet-файл нельзя дописать: существующий файл (например, при продолжении
+            # по журналу) не перезаписывается
+            self.target_file = self.output_file if not os.path.exists(self.output_file) else self._part_file("уже существует")
+            self.parquet_writer = pq.ParquetWriter(self.target_file, schema)
+        self.parquet_writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+
+    def _csv_target_file(self):
+        """
+        CSV дописывается, только если заголовок существующего файла совпадает с COLUMNS
+        (например, не дописываем в текстовый output.csv старых версий)
+        """
+        if not os.path.exists(self.output_file) or os.path.getsize(self.output_file) == 0:
+            return self.output_file
+        with open(self.output_file, encoding='utf-8', errors='replace', newline='') as f:
+            header = next(csv.reader(f), [])
+        if header == self.COLUMNS:
+            return self.output_file
+        return self._part_file("в другом формате (заголовок не совпадает)")
+
+    def _part_file(self, reason):
+        """Новый файл-часть output-<время>.<расширение> рядом с выходным файлом"""
+        stem, ext = os.path.splitext(self.output_file)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        part_file = f'{stem}-{stamp}{ext}'
+        suffix = 1
+        while os.path.exists(part_file):
+            suffix += 1
+            part_file = f'{stem}-{stamp}-{suffix}{ext}'
+        print(f"Файл {self.output_file} {reason}, результаты запуска пишутся в {part_file}")
+        return part_file
+
+    def close(self):
+        """Сброс буфера и закрытие файла"""
+        self.flush()
+        if self.parquet_writer is not None:
+            self.parquet_writer.close()
+            self.parquet_writer = None
+
 
 def main():
     # Парсим аргументы командной строки
     arg_parser = argparse.ArgumentParser(description='Twitter парсер кошельков')
     arg_parser.add_argument('--start', type=int, default=1, help='Начать с указанной итерации')
+    arg_parser.add_argument('--page-timeout', type=float, default=15, help='Максимальное ожидание загрузки страницы (секунды)')
+    arg_parser.add_argument('--search-timeout', type=float, default=10, help='Максимальное ожидание результата поиска (секунды)')
+    arg_parser.add_argument('--search-mode', choices=['url', 'input'], default='url', help='Поиск переходом по URL или вводом в строку поиска')
+    arg_parser.add_argument('--search-tab', choices=['top', 'latest'], default='top', help='Вкладка выдачи: популярное или последнее')
+    arg_parser.add_argument('--since', default=None, help='Искать твиты начиная с даты (YYYY-MM-DD)')
+    arg_parser.add_argument('--until', default=None, help='Искать твиты до даты (YYYY-MM-DD)')
+    arg_parser.add_argument('--extract-mode', choices=['network', 'dom'], default='network', help='Разбор выдачи из ответа API или со страницы')
+    arg_parser.add_argument('--capture-max-requests', type=int, default=100, help='Максимум перехваченных запросов в памяти')
+    arg_parser.add_argument('--capture-max-mb', type=float, default=20, help='Максимальный объем перехваченных запросов в памяти (МБ)')
+    arg_parser.add_argument('--block', choices=sorted(BLOCK_PROFILES), default='full', help='Блокировка ресурсов: none - ничего, media - картинки, видео и шрифты, full - еще и трекеры')
+    arg_parser.add_argument('--fast-start', action='store_true', help='Быстрый старт: браузер без окна (headless)')
+    arg_parser.add_argument('--queue-size', type=int, default=100, help='Размер очередей между этапами чтения, поиска и записи')
+    arg_parser.add_argument('--min-interval', type=float, default=0, help='Минимальный интервал между поисками (секунды)')
+    arg_parser.add_argument('--rate-reserve', type=int, default=1, help='Сколько запросов оставлять в запасе до сброса лимита')
+    arg_parser.add_argument('--slowdown-ratio', type=float, default=0.2, help='Доля оставшегося лимита, ниже которой поиск замедляется')
+    arg_parser.add_argument('--max-rate-limit-retries', type=int, default=5, help='Ожиданий сброса лимита подряд на один запрос, после чего сессия сбрасывается')
+    arg_parser.add_argument('--max-block-resets', type=int, default=3, help='Сбросов сессии из-за спам-блокировки подряд на один запрос, после чего адрес записывается с ошибкой')
+    arg_parser.add_argument('--metrics-file', default=None, help='Файл для периодической выгрузки метрик')
+    arg_parser.add_argument('--metrics-format', choices=['jsonl', 'prometheus'], default='jsonl', help='Формат метрик: JSON lines или Prometheus textfile')
+    arg_parser.add_argument('--metrics-interval', type=float, default=60, help='Интервал выгрузки метрик (секунды)')
+    arg_parser.add_argument('--profile', nargs='?', const='parser.prof', default=None, help='Сохранить профиль cProfile запуска в файл (по умолчанию parser.prof)')
+    arg_parser.add_argument('--batch-size', type=int, default=1, help='Искать до N адресов одним запросом через OR (1 - по одному)')
+    arg_parser.add_argument('--max-query-length', type=int, default=500, help='Максимальная длина пакетного запроса')
+    arg_parser.add_argument('--incremental', action='store_true', help='Перепроверять сохраненные адреса только на новые твиты (устаревшие по --cache-ttl или все, если TTL не задан)')
+    arg_parser.add_argument('--count-mode', choices=['first-page', 'scroll'], default='first-page', help='Подсчет твитов по первой странице выдачи или с прокруткой')
+    arg_parser.add_argument('--count-threshold', type=int, default=None, help='Прекращать прокрутку, когда найдено N твитов')
+    arg_parser.add_argument('--max-scroll-pages', type=int, default=10, help='Максимум прокруток выдачи на адрес')
+    arg_parser.add_argument('--scroll-timeout', type=float, default=3, help='Ожидание новых твитов после прокрутки (секунды)')
+    arg_parser.add_argument('--page-load-timeout', type=float, default=30, help='Максимальное время загрузки страницы браузером (секунды)')
+    arg_parser.add_argument('--script-timeout', type=float, default=10, help='Максимальное время выполнения скрипта на странице (секунды)')
+    arg_parser.add_argument('--command-timeout', type=float, default=60, help='Максимальное время любой команды WebDriver, после него браузер перезапускается (секунды)')
+    arg_parser.add_argument('--max-restarts', type=int, default=3, help='Перезапусков браузера подряд на один запрос')
+    arg_parser.add_argument('--memory-check-every', type=int, default=50, help='Замерять память вкладки каждые N поисков (0 - не замерять)')
+    arg_parser.add_argument('--max-heap-mb', type=float, default=None, help='Пересоздавать вкладку или браузер, если JS heap больше N МБ')
+    arg_parser.add_argument('--max-dom-nodes', type=int, default=None, help='Пересоздавать вкладку или браузер, если узлов DOM больше N')
+    arg_parser.add_argument('--recycle', choices=['tab', 'driver'], default='tab', help='Что пересоздавать при превышении порога памяти')
+    arg_parser.add_argument('--memory-log', default=None, help='CSV-файл с замерами памяти вкладки и задержкой поиска')
+    arg_parser.add_argument('--max-amount', type=int, default=500000, help='Пропускать адреса с суммой больше указанной')
+    arg_parser.add_argument('--chunk-size', type=int, default=10000, help='Количество строк CSV, читаемых за один раз')
+    arg_parser.add_argument('--output', default='output.csv', help='Файл для записи результатов')
+    arg_parser.add_argument('--output-format', choices=['csv', 'parquet'], default='csv', help='Формат выходного файла')
+    arg_parser.add_argument('--flush-rows', type=int, default=100, help='Записывать результаты на диск каждые N строк')
+    arg_parser.add_argument('--flush-interval', type=float, default=30, help='Записывать результаты на диск не реже чем раз в N секунд')
+    arg_parser.add_argument('--progress-file', default='parser_progress.jsonl', help='Журнал обработанных адресов для продолжения после остановки')
+    arg_parser.add_argument('--checkpoint-every', type=int, default=10, help='Сохранять прогресс каждые N адресов')
+    arg_parser.add_argument('--cache-file', default='results.db', help='Файл с сохраненными результатами поиска')
+    arg_parser.add_argument('--cache-ttl', type=float, default=None, help='Время жизни сохраненного результата (часы), по умолчанию бессрочно')
+    arg_parser.add_argument('--no-cache', action='store_true', help='Не использовать сохраненные результаты')
     args = arg_parser.parse_args()
 
     # Настройка прокси из файла
@@ -480,27 +2045,81 @@ def main():
         proxy_username = None
         proxy_password = None
     
+    if args.incremental and args.no_cache:
+        arg_parser.error('--incremental требует сохраненных результатов, уберите --no-cache')
+    
+    result_cache = None
+    if not args.no_cache:
+        cache_ttl = args.cache_ttl * 3600 if args.cache_ttl is not None else None
+        result_cache = ResultCache(args.cache_file, ttl=cache_ttl)
+    
     parser = Parser(
         proxy=proxy,
         proxy_username=proxy_username,
-        proxy_password=proxy_password
+        proxy_password=proxy_password,
+        page_timeout=args.page_timeout,
+        search_timeout=args.search_timeout,
+        result_cache=result_cache,
+        result_writer=ResultWriter(args.output, args.output_format, args.flush_rows, args.flush_interval),
+        progress_journal=ProgressJournal(args.progress_file, checkpoint_every=args.checkpoint_every),
+        search_mode=args.search_mode,
+        search_tab=args.search_tab,
+        search_since=args.since,
+        search_until=args.until,
+        extract_mode=args.extract_mode,
+        capture_max_requests=args.capture_max_requests,
+        capture_max_bytes=int(args.capture_max_mb * 1024 * 1024),
+        block_profile=args.block,
+        fast_start=args.fast_start,
+        queue_size=args.queue_size,
+        rate_limiter=RateLimiter(args.min_interval, args.rate_reserve, args.slowdown_ratio),
+        metrics=Metrics(args.metrics_file, args.metrics_format, args.metrics_interval),
+        batch_size=args.batch_size,
+        max_query_length=args.max_query_length,
+        incremental=args.incremental,
+        count_mode=args.count_mode,
+        count_threshold=args.count_threshold,
+        max_scroll_pages=args.max_scroll_pages,
+        scroll_timeout=args.scroll_timeout,
+        page_load_timeout=args.page_load_timeout,
+        script_timeout=args.script_timeout,
+        command_timeout=args.command_timeout,
+        max_restarts=args.max_restarts,
+        max_rate_limit_retries=args.max_rate_limit_retries,
+        max_block_resets=args.max_block_resets,
+        memory_check_every=args.memory_check_every,
+        max_heap_mb=args.max_heap_mb,
+        max_dom_nodes=args.max_dom_nodes,
+        recycle_mode=args.recycle,
+        memory_log=args.memory_log
     )
     
-    parser.login(url="https://x.com/home", username="", password="")
-    
     # читаем файл с кошельками
-    wallet_data = parser.read_wallet_addresses('input.csv') # Замените на csv файл с кошельками
-    
-    if not wallet_data:
-        print("No wallet addresses found in the CSV file or error reading the file.")
+    try:
+        wallet_data = parser.read_wallet_addresses('input.csv', max_amount=args.max_amount, chunk_size=args.chunk_size) # Замените на csv файл с кошельками
+    except FileNotFoundError as e:
+        print(e)
         return
     
+    # Профилируется поток браузера; фоновые этапы конвейера в профиль не попадают
+    profiler = cProfile.Profile() if args.profile else None
+    
     try:
+        if profiler is not None:
+            profiler.enable()
+        
         # Передаем начальную итерацию
+        # (браузер открывается только для адресов, которых нет в кэше)
         parser.parse_data(wallet_data, args.start)
         
     finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+            print(f"Профиль сохранен в {args.profile}")
         parser.close()
+        if result_cache is not None:
+            result_cache.close()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file